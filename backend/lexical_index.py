@@ -0,0 +1,73 @@
+import json
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+# Must stay in sync with the tokenizer in pipelines/lexical_index_builder.py
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into alphanumeric tokens (codes split on '_')."""
+    return TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+
+
+class LexicalIndex:
+    """BM25 search over the inverted index written by the data importer.
+
+    BM25 weights are precomputed per term at load time, so a query is a few
+    vectorized adds followed by a partial sort.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        with open(path, "r") as file:
+            data = json.load(file)
+
+        self.doc_ids = np.array(data["doc_ids"], dtype=np.int64)
+        doc_lengths = np.array(data["doc_lengths"], dtype=np.float32)
+        num_docs = len(self.doc_ids)
+        avg_doc_length = doc_lengths.mean() if num_docs else 1.0
+
+        # Term i owns positions[offsets[i]:offsets[i + 1]] and the BM25 weight
+        # of the term in each of those documents
+        self.terms = {term: i for i, term in enumerate(data["terms"])}
+        self.offsets = np.array(data["offsets"], dtype=np.int64)
+        self.positions = np.array(data["positions"], dtype=np.int64)
+        counts = np.array(data["counts"], dtype=np.float32)
+
+        doc_freqs = np.diff(self.offsets)
+        idf = np.log1p((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        norms = k1 * (1 - b + b * doc_lengths[self.positions] / avg_doc_length)
+        self.weights = np.repeat(idf, doc_freqs) * counts * (k1 + 1) / (counts + norms)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(self, text: str, limit: Optional[int] = 10) -> List[Tuple[int, float]]:
+        """Return the top (point_id, BM25 score) pairs for a text query.
+
+        With limit=None every matching document is returned, best first.
+        """
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        matched = False
+        for term, query_count in Counter(tokenize(text)).items():
+            i = self.terms.get(term)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            scores[self.positions[start:end]] += query_count * self.weights[start:end]
+            matched = True
+
+        if not matched:
+            return []
+
+        candidates = np.flatnonzero(scores)
+        if limit is not None and limit < len(candidates):
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return list(zip(self.doc_ids[candidates].tolist(), scores[candidates].tolist()))
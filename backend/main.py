@@ -4,8 +4,12 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from transformers import CLIPProcessor, CLIPModel
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Filter, FieldCondition, Range, MatchValue, MatchAny
+from qdrant_client.http.models import Filter, FieldCondition, Range, MatchValue, MatchAny, HasIdCondition
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
 import torch
+from lexical_index import LexicalIndex
 
 app = FastAPI()
 
@@ -37,6 +41,7 @@ class Query(BaseModel):
     text_query: str = Field(..., description="Text query for semantic search")
     filters: Optional[FilterParams] = Field(default=None, description="Optional filters")
     limit: Optional[int] = Field(default=10, description="Maximum number of results to return", ge=1, le=100)
+    hybrid: Optional[bool] = Field(default=False, description="Fuse lexical (BM25) and semantic retrieval")
 
 class SearchResult(BaseModel): 
     product_id: int 
@@ -55,6 +60,15 @@ class SearchResult(BaseModel):
     gender_name: Optional[str] = None
 
 
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> Dict[int, float]:
+    """Merge ranked lists of point ids into fused scores, highest first."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, point_id in enumerate(ranking, 1):
+            scores[point_id] = scores.get(point_id, 0.0) + 1.0 / (k + rank)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+
 class SemanticSearchService:
     def __init__(
         self,
@@ -62,6 +76,8 @@ class SemanticSearchService:
         qdrant_host: str = "localhost",
         qdrant_port: int = 6333,
         model_name: str = "openai/clip-vit-base-patch32",
+        lexical_index_path: str = os.getenv("LEXICAL_INDEX_PATH", "../data/lexical_index.json"),
+        hybrid_candidates: int = 4,
     ):
         self.collection_name = collection_name
         self.qdrant_client = QdrantClient(host=qdrant_host, port=qdrant_port)
@@ -69,7 +85,56 @@ class SemanticSearchService:
         self.processor = CLIPProcessor.from_pretrained(model_name)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model.to(self.device)
-    
+
+        self.hybrid_candidates = hybrid_candidates
+        self.executor = ThreadPoolExecutor(max_workers=8)
+
+        # Lexical leg of hybrid search, built by the data importer. When the
+        # importer rewrites the file, the new index is loaded in the background
+        # and swapped in while requests keep using the previous one.
+        self.lexical_index_path = lexical_index_path
+        self.lexical_index = None
+        self.lexical_index_mtime = None
+        self.lexical_index_future = None
+        self.lexical_index_lock = threading.Lock()
+        self.lexical_index_loader = ThreadPoolExecutor(max_workers=1)
+        self.get_lexical_index()
+
+    def load_lexical_index(self) -> Optional[LexicalIndex]:
+        """Load the lexical index from disk and swap it in."""
+        try:
+            lexical_index = LexicalIndex(self.lexical_index_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading lexical index '{self.lexical_index_path}': {str(e)}")
+            return self.lexical_index
+
+        with self.lexical_index_lock:
+            self.lexical_index = lexical_index
+        print(f"Lexical index with {len(lexical_index)} documents loaded.")
+        return lexical_index
+
+    def get_lexical_index(self) -> Optional[LexicalIndex]:
+        """Return the current lexical index, scheduling a reload if the file changed.
+
+        Only the very first load is waited for; later reloads happen off the
+        request path.
+        """
+        try:
+            mtime = os.path.getmtime(self.lexical_index_path)
+        except OSError:
+            mtime = None
+
+        with self.lexical_index_lock:
+            reloading = self.lexical_index_future is not None and not self.lexical_index_future.done()
+            if mtime is not None and mtime != self.lexical_index_mtime and not reloading:
+                self.lexical_index_mtime = mtime
+                self.lexical_index_future = self.lexical_index_loader.submit(self.load_lexical_index)
+            lexical_index, future = self.lexical_index, self.lexical_index_future
+
+        if lexical_index is None and future is not None:
+            lexical_index = future.result()
+        return lexical_index
+
     def build_filter(self, filters: Optional[FilterParams]) -> Optional[Filter]:
         """Build Qdrant filter from filter parameters."""
         if not filters:
@@ -143,44 +208,129 @@ class SemanticSearchService:
             text_features = self.model.get_text_features(**inputs)
         return torch.nn.functional.normalize(text_features, dim=-1)[0].cpu().numpy().tolist()
 
-    def search(
+    def to_search_result(self, payload: Dict[str, Any], score: float) -> SearchResult:
+        """Convert a Qdrant payload into a SearchResult."""
+        return SearchResult(
+            product_id=payload["product_id"],
+            name=payload["name"],
+            description=payload["description"],
+            image_url=payload["image_url"],
+            link=payload["link"],
+            score=score,
+            current_price=payload["current_price"],
+            currency=payload["currency"],
+            color_names=payload["color_names"],
+            sizes=payload["sizes"],
+            region=payload["region"],
+            brand_name=payload["brand_name"],
+            category_name=payload["category_name"],
+            gender_name=payload["gender_name"]
+        )
+
+    def dense_search(
         self,
         text_query: str,
-        filters: Optional[FilterParams] = None,
-        limit: int = 10,
-        score_threshold: float = 0.5
-    ) -> List[SearchResult]:
-        """Search for products using text query and optional filters."""
+        qdrant_filter: Optional[Filter],
+        limit: int,
+        score_threshold: float
+    ):
+        """Run CLIP similarity search in Qdrant."""
         query_vector = self.encode_text(text_query)
-        qdrant_filter = self.build_filter(filters)
-        
-        results = self.qdrant_client.search(
+        return self.qdrant_client.search(
             collection_name=self.collection_name,
             query_vector=query_vector,
             limit=limit,
             score_threshold=score_threshold,
             query_filter=qdrant_filter
         )
-        return [
-            SearchResult(
-                product_id=result.payload["product_id"],
-                name=result.payload["name"],
-                description=result.payload["description"],
-                image_url=result.payload["image_url"],
-                link=result.payload["link"],
-                score=result.score,
-                current_price=result.payload["current_price"],
-                currency=result.payload["currency"],
-                color_names=result.payload["color_names"],
-                sizes=result.payload["sizes"],
-                region=result.payload["region"],
-                brand_name=result.payload["brand_name"],
-                category_name=result.payload["category_name"],
-                gender_name=result.payload["gender_name"]
+
+    def lexical_search(
+        self,
+        lexical_index: LexicalIndex,
+        text_query: str,
+        qdrant_filter: Optional[Filter],
+        limit: int
+    ):
+        """Run BM25 over the lexical index and fetch matching points in rank order.
+
+        BM25 hits are checked against the filters page by page, with each page
+        four times larger than the last, until limit of them pass or the hits
+        run out. A selective filter then still gets lexical results.
+        """
+        matches = []
+        checked = 0
+        page_limit = limit
+        while len(matches) < limit:
+            hits = lexical_index.search(text_query, page_limit)
+            point_ids = [point_id for point_id, _ in hits[checked:]]
+            if not point_ids:
+                break
+
+            must_conditions = [HasIdCondition(has_id=point_ids)]
+            if qdrant_filter:
+                must_conditions.extend(qdrant_filter.must)
+            points, _ = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=Filter(must=must_conditions),
+                limit=len(point_ids),
+                with_payload=True
             )
-            for result in results
+            points_by_id = {point.id: point for point in points}
+            matches.extend(points_by_id[point_id] for point_id in point_ids if point_id in points_by_id)
+
+            if len(hits) < page_limit:
+                break
+            checked = len(hits)
+            page_limit *= 4
+
+        return matches[:limit]
+
+    def hybrid_search(
+        self,
+        text_query: str,
+        filters: Optional[FilterParams] = None,
+        limit: int = 10,
+        score_threshold: float = 0.5
+    ) -> List[SearchResult]:
+        """Search with lexical and dense retrieval in parallel, merged by reciprocal rank fusion."""
+        lexical_index = self.get_lexical_index()
+        if lexical_index is None:
+            raise ValueError("Hybrid search is unavailable: lexical index not found, run the data importer first")
+
+        qdrant_filter = self.build_filter(filters)
+        candidates = limit * self.hybrid_candidates
+
+        dense_future = self.executor.submit(self.dense_search, text_query, qdrant_filter, candidates, score_threshold)
+        lexical_future = self.executor.submit(self.lexical_search, lexical_index, text_query, qdrant_filter, candidates)
+        dense_results = dense_future.result()
+        lexical_results = lexical_future.result()
+
+        payloads = {point.id: point.payload for point in lexical_results}
+        payloads.update({result.id: result.payload for result in dense_results})
+        fused = reciprocal_rank_fusion([
+            [result.id for result in dense_results],
+            [point.id for point in lexical_results],
+        ])
+        return [
+            self.to_search_result(payloads[point_id], score)
+            for point_id, score in list(fused.items())[:limit]
         ]
 
+    def search(
+        self,
+        text_query: str,
+        filters: Optional[FilterParams] = None,
+        limit: int = 10,
+        score_threshold: float = 0.5,
+        hybrid: bool = False
+    ) -> List[SearchResult]:
+        """Search for products using text query and optional filters."""
+        if hybrid:
+            return self.hybrid_search(text_query, filters, limit, score_threshold)
+
+        results = self.dense_search(text_query, self.build_filter(filters), limit, score_threshold)
+        return [self.to_search_result(result.payload, result.score) for result in results]
+
 # Instantiate the search service
 search_service = SemanticSearchService()
 
@@ -212,14 +362,21 @@ async def search(query: Query):
             "category_name": ["Dresses"],
             "brand_name": ["Zara"]
         },
-        "limit": 10
+        "limit": 10,
+        "hybrid": true
     }
+
+    Setting "hybrid" also ranks exact matches on name, description, brand
+    and product code, fused with the semantic results. In hybrid mode
+    "score" is the reciprocal rank fusion score (roughly 0.016-0.033 with
+    two retrievers), not a cosine similarity.
     """
     try:
         results = search_service.search(
             text_query=query.text_query,
             filters=query.filters,
-            limit=query.limit
+            limit=query.limit,
+            hybrid=query.hybrid
         )
         return results
     except ValueError as e:
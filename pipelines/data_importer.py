@@ -11,12 +11,17 @@ import pandas as pd
 import json
 from sklearn.preprocessing import MultiLabelBinarizer
 from sklearn.impute import SimpleImputer
+from sklearn.neighbors import KDTree
 from datetime import datetime
-from webcolors import hex_to_name
+from webcolors import hex_to_name, name_to_hex, names, normalize_hex
+from functools import lru_cache
 import time
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from io import BytesIO
+import threading
+from image_cache import ImageCache
+from lexical_index_builder import LexicalIndexBuilder
 
 
 
@@ -47,16 +52,96 @@ def create_robust_session():
     return session
 
 
+# One long-lived pooled session per worker thread
+_thread_local = threading.local()
 
-def convert_rgb_to_names(colors):
-        color_names = []
-        for color in colors:
-            try:
-                # Convert RGB to the closest color name
-                color_names.append(hex_to_name(color))
-            except ValueError:
-                color_names.append("Unknown")  # Handle unmapped colors
-        return color_names
+
+def get_session():
+    """Return the current worker's shared session, creating it on first use."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = create_robust_session()
+        _thread_local.session = session
+    return session
+
+
+
+# Memoized hex -> color name lookup shared across load_data calls
+_COLOR_NAME_CACHE = {}
+
+
+def _rgb_to_lab(rgb):
+    """Convert an (N, 3) array of 0-255 sRGB values to CIE Lab (D65)."""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+
+    # sRGB -> XYZ, normalized by the D65 white point
+    matrix = np.array([
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ])
+    xyz = linear @ matrix.T / np.array([0.95047, 1.0, 1.08883])
+
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+
+def _hex_to_rgb_array(hex_colors):
+    """Convert normalized '#rrggbb' strings to an (N, 3) array of ints."""
+    values = np.array([int(color[1:], 16) for color in hex_colors], dtype=np.int64)
+    return np.stack([(values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF], axis=1)
+
+
+@lru_cache(maxsize=1)
+def _color_palette():
+    """Return the CSS3 color names and a KD-tree over their Lab coordinates."""
+    # Deduplicate aliases (gray/grey, aqua/cyan...) the same way hex_to_name does
+    palette = {}
+    for name in names():
+        color = name_to_hex(name)
+        palette[color] = hex_to_name(color)
+
+    palette_names = np.array(list(palette.values()))
+    palette_tree = KDTree(_rgb_to_lab(_hex_to_rgb_array(list(palette.keys()))))
+    return palette_names, palette_tree
+
+
+def resolve_color_names(hex_colors):
+    """Map hex colors to the nearest CSS3 color name in Lab space.
+
+    Unseen colors are resolved in a single KD-tree query and memoized;
+    invalid hex strings map to "Unknown".
+    """
+    pending = {}
+    for color in set(hex_colors):
+        if color in _COLOR_NAME_CACHE:
+            continue
+        try:
+            pending[color] = normalize_hex(color)
+        except (ValueError, TypeError, AttributeError):
+            _COLOR_NAME_CACHE[color] = "Unknown"
+
+    if pending:
+        palette_names, palette_tree = _color_palette()
+        lab = _rgb_to_lab(_hex_to_rgb_array(list(pending.values())))
+        _, indices = palette_tree.query(lab, k=1)
+        nearest = palette_names[indices[:, 0]]
+        _COLOR_NAME_CACHE.update(zip(pending.keys(), nearest.tolist()))
+
+    return [_COLOR_NAME_CACHE[color] for color in hex_colors]
+
+
+def convert_color_column(colors: pd.Series) -> pd.Series:
+    """Resolve the color names for a whole column of hex color lists at once."""
+    exploded = colors.apply(lambda x: x if isinstance(x, list) else []).explode().dropna()
+    resolved = pd.Series(resolve_color_names(exploded.tolist()), index=exploded.index)
+    color_names = resolved.groupby(level=0).agg(list).reindex(colors.index)
+    return color_names.apply(lambda x: x if isinstance(x, list) else [])
 
 
 def load_data(file_path):
@@ -68,7 +153,7 @@ def load_data(file_path):
     df = pd.DataFrame(data)
 
     # Add a new column for human-readable color names
-    df['color_names'] = df['colors'].apply(lambda x: convert_rgb_to_names(x if isinstance(x, list) else []))
+    df['color_names'] = convert_color_column(df['colors'])
 
     # Explode the images column to create a new row for each image
     df['images'] = df['images'].apply(lambda x: x if isinstance(x, list) else [])
@@ -87,24 +172,26 @@ def encode_text(text, processor, model):
     return output.numpy()
 
 
-def encode_image(image_url, processor, model, max_retries=3, retry_delay=2):
+def encode_image(image_url, processor, model, max_retries=3, retry_delay=2, cache=None):
     """Encode image using CLIP model with robust error handling."""
-    session = create_robust_session()
+    session = get_session()
     
     for attempt in range(max_retries):
         try:
-            # Set longer timeout and verify SSL
-            response = session.get(
-                image_url,
-                timeout=30,  # increased timeout
-                verify=True,  # verify SSL certificates
-                stream=True
-            )
-            response.raise_for_status()
-            
-            # Read image data into memory
-            image_data = BytesIO(response.content)
-            image = Image.open(image_data).convert("RGB")
+            if cache is not None:
+                # Serve the pre-resized thumbnail, revalidating against the origin
+                image = cache.get_image(image_url, session, timeout=30)
+            else:
+                response = session.get(
+                    image_url,
+                    timeout=30,  # increased timeout
+                    verify=True  # verify SSL certificates
+                )
+                try:
+                    response.raise_for_status()
+                    image = Image.open(BytesIO(response.content)).convert("RGB")
+                finally:
+                    response.close()
             
             # Process image with CLIP
             inputs = processor(images=image, return_tensors="pt", padding=True)
@@ -132,12 +219,6 @@ def encode_image(image_url, processor, model, max_retries=3, retry_delay=2):
         except Exception as e:
             print(f"Error processing image {image_url}: {str(e)}")
             return None
-        
-        finally:
-            # Clean up
-            if 'response' in locals():
-                response.close()
-            session.close()
 
 
 def create_collection(client: QdrantClient, collection_name: str):
@@ -158,7 +239,7 @@ def create_collection(client: QdrantClient, collection_name: str):
     print(f"Collection '{collection_name}' created.")
 
 
-def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 50):
+def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 50, cache_dir: str = "../data/image_cache", lexical_index_path: str = "../data/lexical_index.json"):
     """Process products and insert into Qdrant."""
     # Initialize Qdrant client
     client = QdrantClient("localhost", port=6333)
@@ -167,11 +248,18 @@ def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 5
     model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
     processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
     
+    # Downloaded images and thumbnails are reused across re-imports
+    image_cache = ImageCache(cache_dir)
+    
+    # Sparse BM25 index over name, description, brand and code for hybrid search
+    lexical_index = LexicalIndexBuilder()
+    
     # Create collection
     create_collection(client, collection_name)
     
     # Process products in batches
     points = []
+    documents = []
     processed_count = 0
     failed_count = 0
     row_count = 0
@@ -183,7 +271,7 @@ def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 5
             text = f"{row.name} {row.description}"
             text_vector = encode_text(text, processor, model)
 
-            image_vector = encode_image(row.images, processor, model)
+            image_vector = encode_image(row.images, processor, model, cache=image_cache)
             if image_vector is None:
                 continue
             point_id = int(f"{row.id}")
@@ -192,6 +280,7 @@ def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 5
 
             point = PointStruct( id=point_id, vector=combined_vector.tolist(), payload={ "product_id": row.id, "name": row.name, "description": row.description, "material": row.material, "rating": row.rating, "code": row.code, "brand_id": row.brand_id, "brand_name": row.brand_name, "category_id": row.category_id, "category_name": row.category_name, "gender_id": row.gender_id, "gender_name": row.gender_name, "shop_id": row.shop_id, "shop_name": row.shop_name, "link": row.link, "status": row.status, "colors": row.colors, "sizes": row.sizes, "region": row.region, "currency": row.currency, "current_price": row.current_price, "old_price": row.old_price, "off_percent": row.off_percent, "update_date": row.update_date, "color_names": row.color_names, "image_url": row.images } ) 
             points.append(point)
+            documents.append((point_id, row.name, row.description, row.brand_name, row.code))
             if len(points) >= batch_size:
                     try:
                         client.upsert(
@@ -201,12 +290,15 @@ def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 5
                         processed_count += len(points)
                         print(f"Inserted {processed_count} points.")
                         print(f"Processed {row_count} rows")
-                        points = []
+                        # Only index products that actually made it into Qdrant
+                        for document in documents:
+                            lexical_index.add(*document)
                     except Exception as e:
                         print(f"Error inserting batch: {str(e)}")
-                        points = []
+                    points = []
+                    documents = []
         except Exception as e:
-            print(f"Error processing product {row['id']}: {str(e)}")
+            print(f"Error processing product {row.id}: {str(e)}")
             failed_count += 1
             continue
     
@@ -219,8 +311,12 @@ def process_products(df: pd.DataFrame, collection_name: str, batch_size: int = 5
             )
             processed_count += len(points)
             print(f"Inserted final batch. Total points inserted: {processed_count}")
+            for document in documents:
+                lexical_index.add(*document)
         except Exception as e:
             print(f"Error inserting final batch: {str(e)}")
+    
+    lexical_index.save(lexical_index_path)
 
 
 def search_products(query_text: str, collection_name: str, limit: int = 5):
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+
+# CLIP ViT-B/32 resizes the shortest side to 224px before center cropping
+THUMBNAIL_SIZE = 224
+
+
+class ImageCache:
+    """On-disk cache of downloaded image bytes and CLIP-sized thumbnails.
+
+    Entries are keyed by URL and revalidated with ETag/Last-Modified, so a
+    re-import only transfers images that actually changed. If the origin is
+    unreachable, a cached copy is served as-is. The cache is bounded to
+    max_bytes; once it overflows, least recently used entries are evicted
+    down to low_water * max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 5 * 1024 ** 3, low_water: float = 0.9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # In-memory LRU index of {key: size}, least recently used first
+        entries = self._scan()
+        self._entries = OrderedDict(
+            (key, size) for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1])
+        )
+        self._total_bytes = sum(self._entries.values())
+
+    def _key(self, url: str):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths_for_key(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.bin", f"{base}.json", f"{base}_{THUMBNAIL_SIZE}.jpg"
+
+    def _paths(self, url: str):
+        return self._paths_for_key(self._key(url))
+
+    def _read_meta(self, meta_path: str):
+        try:
+            with open(meta_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _read(self, path: str) -> bytes:
+        with open(path, "rb") as file:
+            return file.read()
+
+    def _write(self, path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def _mark_used(self, key: str, thumb_path: str):
+        # The thumbnail mtime persists the LRU order across runs
+        try:
+            os.utime(thumb_path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _refresh(self, url: str, session, timeout: int):
+        """Make sure the cached entry for url is current.
+
+        Returns (data, thumbnail) when a new copy was downloaded, or
+        (None, None) when the cached copy is still valid or the origin is
+        unreachable.
+        """
+        key = self._key(url)
+        data_path, meta_path, thumb_path = self._paths_for_key(key)
+        meta = self._read_meta(meta_path)
+        cached = meta is not None and os.path.exists(data_path) and os.path.exists(thumb_path)
+
+        headers = {}
+        if cached:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = session.get(url, headers=headers, timeout=timeout, verify=True)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if not cached:
+                raise
+            self._mark_used(key, thumb_path)
+            return None, None
+
+        try:
+            if cached and response.status_code == 304:
+                self._mark_used(key, thumb_path)
+                return None, None
+
+            response.raise_for_status()
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Unexpected status {response.status_code} for {url}", response=response
+                )
+            data = response.content
+        finally:
+            response.close()
+
+        thumbnail = self._make_thumbnail(data)
+        meta = json.dumps({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }).encode("utf-8")
+
+        self._write(thumb_path, thumbnail)
+        self._write(data_path, data)
+        self._write(meta_path, meta)
+
+        with self._lock:
+            size = len(thumbnail) + len(data) + len(meta)
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=key)
+
+        return data, thumbnail
+
+    def fetch(self, url: str, session, timeout: int = 30):
+        """Return (image bytes, thumbnail bytes), revalidating any cached copy."""
+        data, thumbnail = self._refresh(url, session, timeout)
+        if data is None:
+            data_path, _, thumb_path = self._paths(url)
+            data, thumbnail = self._read(data_path), self._read(thumb_path)
+        return data, thumbnail
+
+    def get_image(self, url: str, session, timeout: int = 30) -> Image.Image:
+        """Return the cached CLIP-sized thumbnail for an image URL."""
+        _, thumbnail = self._refresh(url, session, timeout)
+        if thumbnail is None:
+            thumbnail = self._read(self._paths(url)[2])
+        return Image.open(BytesIO(thumbnail)).convert("RGB")
+
+    def _make_thumbnail(self, data: bytes) -> bytes:
+        """Resize the shortest side to THUMBNAIL_SIZE, keeping the aspect ratio."""
+        image = Image.open(BytesIO(data)).convert("RGB")
+        scale = THUMBNAIL_SIZE / min(image.size)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.BICUBIC)
+
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=95)
+        return output.getvalue()
+
+    def _scan(self):
+        """Return {key: (total size, last used time)} for every cached entry.
+
+        Temporary files left behind by interrupted writes are removed.
+        """
+        entries = {}
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".tmp"):
+                os.remove(entry.path)
+                continue
+            stat = entry.stat()
+            key = entry.name.split(".")[0].split("_")[0]
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+        return entries
+
+    def _evict(self, keep: str = None):
+        # Caller must hold self._lock
+        target = self.max_bytes * self.low_water
+        for key in list(self._entries):
+            if self._total_bytes <= target:
+                break
+            if key == keep:
+                continue
+            for path in self._paths_for_key(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes -= self._entries.pop(key)
+
+    def evict(self, keep: str = None):
+        """Drop least recently used entries down to the low-water mark.
+
+        The entry named by keep (typically the one just written) is never evicted.
+        """
+        with self._lock:
+            self._evict(keep=keep)
@@ -0,0 +1,70 @@
+import json
+import os
+import re
+from collections import Counter
+
+
+# Must stay in sync with the tokenizer in backend/lexical_index.py
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Lowercase and split text into alphanumeric tokens (codes split on '_')."""
+    return TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+
+
+class LexicalIndexBuilder:
+    """Build the inverted index used for BM25 retrieval in the backend.
+
+    Each point is indexed on its name, description, brand and product code.
+    Adding the same point id again replaces its previous document, matching
+    Qdrant's upsert semantics.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def add(self, point_id, name, description, brand_name, code):
+        tokens = []
+        for field in (name, description, brand_name, code):
+            tokens.extend(tokenize(field))
+        self.documents[point_id] = Counter(tokens)
+
+    def save(self, path):
+        """Write the index with postings flattened into per-term slices.
+
+        Term i owns positions[offsets[i]:offsets[i + 1]] (document positions
+        into doc_ids) and the matching term counts.
+        """
+        doc_ids = []
+        doc_lengths = []
+        postings = {}
+        for position, (point_id, term_counts) in enumerate(self.documents.items()):
+            doc_ids.append(point_id)
+            doc_lengths.append(sum(term_counts.values()))
+            for term, count in term_counts.items():
+                postings.setdefault(term, []).append((position, count))
+
+        terms = list(postings)
+        offsets = [0]
+        positions = []
+        counts = []
+        for term in terms:
+            for position, count in postings[term]:
+                positions.append(position)
+                counts.append(count)
+            offsets.append(len(positions))
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({
+                "doc_ids": doc_ids,
+                "doc_lengths": doc_lengths,
+                "terms": terms,
+                "offsets": offsets,
+                "positions": positions,
+                "counts": counts,
+            }, file)
+        os.replace(tmp_path, path)
+        print(f"Lexical index with {len(doc_ids)} documents saved to '{path}'.")
@@ -0,0 +1,51 @@
+import math
+
+import pandas as pd
+import pytest
+
+import data_importer
+from data_importer import convert_color_column, resolve_color_names
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    data_importer._COLOR_NAME_CACHE.clear()
+    yield
+    data_importer._COLOR_NAME_CACHE.clear()
+
+
+def test_exact_hex_keeps_its_name():
+    assert resolve_color_names(["#0000FF", "#808080", "#ffffff"]) == ["blue", "gray", "white"]
+
+
+def test_near_miss_hex_maps_to_nearest_css3_name():
+    assert resolve_color_names(["#FF0001", "#0000fe"]) == ["red", "blue"]
+
+
+def test_shorthand_hex_is_normalized():
+    assert resolve_color_names(["#fff", "#F00"]) == ["white", "red"]
+
+
+def test_invalid_and_none_are_unknown():
+    assert resolve_color_names(["not-a-color", "#12345", None]) == ["Unknown", "Unknown", "Unknown"]
+
+
+def test_convert_color_column_keeps_row_alignment():
+    colors = pd.Series(
+        [["#0000FF", "#FF0001"], [], None, math.nan, ["bad", None, "#fff"]],
+        index=[10, 11, 12, 13, 14],
+    )
+    color_names = convert_color_column(colors)
+
+    assert list(color_names.index) == [10, 11, 12, 13, 14]
+    assert color_names.tolist() == [["blue", "red"], [], [], [], ["Unknown", "white"]]
+
+
+def test_repeated_hexes_are_served_from_the_cache(monkeypatch):
+    assert resolve_color_names(["#FF0001"]) == ["red"]
+
+    def palette_unavailable():
+        raise AssertionError("palette queried for a cached color")
+
+    monkeypatch.setattr(data_importer, "_color_palette", palette_unavailable)
+    assert resolve_color_names(["#FF0001", "#FF0001"]) == ["red", "red"]
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+import transformers
+
+from lexical_index_builder import LexicalIndexBuilder
+
+
+class StubModel:
+    def to(self, device):
+        return self
+
+
+@pytest.fixture(scope="module")
+def main():
+    # main.py builds its service at import time; keep CLIP off the network
+    patcher = pytest.MonkeyPatch()
+    patcher.setattr(transformers.CLIPModel, "from_pretrained", classmethod(lambda cls, *a, **k: StubModel()))
+    patcher.setattr(transformers.CLIPProcessor, "from_pretrained", classmethod(lambda cls, *a, **k: None))
+    import main
+    yield main
+    patcher.undo()
+
+
+def payload(point_id, brand_name):
+    return {
+        "product_id": point_id, "name": f"Product {point_id}", "description": None,
+        "image_url": f"https://example.com/{point_id}.jpg", "link": None,
+        "current_price": None, "currency": None, "color_names": [], "sizes": [],
+        "region": None, "brand_name": brand_name, "category_name": None, "gender_name": None,
+    }
+
+
+class StubQdrantClient:
+    """Serves dense results in a fixed order and filters scrolls by id and brand."""
+
+    def __init__(self, points, dense_order):
+        self.points = points
+        self.dense_order = dense_order
+        self.scrolled_ids = []
+
+    def matches(self, point_id, conditions):
+        for condition in conditions:
+            if hasattr(condition, "has_id"):
+                if point_id not in condition.has_id:
+                    return False
+            elif self.points[point_id][condition.key] not in condition.match.any:
+                return False
+        return True
+
+    def search(self, collection_name, query_vector, limit, score_threshold, query_filter):
+        conditions = query_filter.must if query_filter else []
+        return [
+            SimpleNamespace(id=point_id, payload=self.points[point_id], score=0.9)
+            for point_id in self.dense_order if self.matches(point_id, conditions)
+        ][:limit]
+
+    def scroll(self, collection_name, scroll_filter, limit, with_payload):
+        self.scrolled_ids.append(list(scroll_filter.must[0].has_id))
+        found = [
+            SimpleNamespace(id=point_id, payload=self.points[point_id])
+            for point_id in self.points if self.matches(point_id, scroll_filter.must)
+        ]
+        return found[:limit], None
+
+
+@pytest.fixture
+def service(main, tmp_path):
+    builder = LexicalIndexBuilder()
+    points = {}
+    # 1-60 are strong lexical matches for "silk scarf" from other brands
+    for point_id in range(1, 61):
+        builder.add(point_id, "Silk Scarf", "silk scarf silk scarf", "Acme", f"A{point_id}")
+        points[point_id] = payload(point_id, "Acme")
+    builder.add(100, "Scarf", "A long knitted piece", "Zara", "ZR100")
+    points[100] = payload(100, "Zara")
+    builder.add(101, "Wool Hat", "Warm hat", "Zara", "ZR101")
+    points[101] = payload(101, "Zara")
+    path = str(tmp_path / "lexical_index.json")
+    builder.save(path)
+
+    service = main.SemanticSearchService(lexical_index_path=path)
+    service.qdrant_client = StubQdrantClient(points, dense_order=[101, 5, 100])
+    service.encode_text = lambda text: [0.0] * 512
+    return service
+
+
+def test_reciprocal_rank_fusion_orders_and_breaks_ties(main):
+    fused = main.reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60)
+
+    # 3 appears in both lists; 2 and 4 tie at rank 2 and keep first-seen order
+    assert list(fused) == [3, 1, 2, 4]
+    assert fused[3] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2] == fused[4]
+    assert list(main.reciprocal_rank_fusion([[8], [7]])) == [8, 7]
+
+
+def test_hybrid_search_fuses_both_legs(service):
+    results = service.search("silk scarf", limit=3, score_threshold=0.0, hybrid=True)
+
+    # 5 is ranked by both legs, so it beats the single-leg leaders, which tie
+    # and keep the dense leg first
+    assert [result.product_id for result in results] == [5, 101, 1]
+    assert results[0].score == pytest.approx(1 / 62 + 1 / 65)
+
+
+def test_filtered_hybrid_search_keeps_lexical_matches(main, service):
+    filters = main.FilterParams(brand_name=["Zara"])
+    results = service.search("silk scarf", filters=filters, limit=1, score_threshold=0.0, hybrid=True)
+
+    # The only Zara scarf ranks below 60 other-brand hits lexically; paging past
+    # the first candidates still finds it, so it is fused from both legs
+    assert [result.product_id for result in results] == [100]
+    assert results[0].score == pytest.approx(1 / 62 + 1 / 61)
+    assert len(service.qdrant_client.scrolled_ids) > 1
+
+
+def test_hybrid_search_without_index_is_rejected(main, tmp_path):
+    service = main.SemanticSearchService(lexical_index_path=str(tmp_path / "missing.json"))
+    with pytest.raises(ValueError):
+        service.search("silk scarf", hybrid=True)
+
+
+def test_rewritten_index_is_swapped_in(service):
+    first = service.get_lexical_index()
+    builder = LexicalIndexBuilder()
+    builder.add(200, "Velvet Blazer", None, "Zara", "ZR200")
+    builder.save(service.lexical_index_path)
+    service.lexical_index_mtime = None  # mtime resolution can hide a fast rewrite
+
+    service.get_lexical_index()
+    service.lexical_index_future.result()
+    assert service.get_lexical_index() is not first
+    assert service.get_lexical_index().search("velvet")[0][0] == 200
@@ -0,0 +1,169 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+import requests
+from PIL import Image
+
+from image_cache import THUMBNAIL_SIZE, ImageCache
+
+
+def make_image(color):
+    output = BytesIO()
+    Image.new("RGB", (640, 480), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+IMAGES = {"/red.png": make_image("red"), "/blue.png": make_image("blue")}
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/not-modified.png":
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        etag = f'"{self.path.strip("/")}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        body = IMAGES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    ImageHandler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def cache_size(cache_dir):
+    return sum(entry.stat().st_size for entry in os.scandir(cache_dir))
+
+
+def test_fetch_stores_bytes_and_thumbnail_then_revalidates(server, tmp_path):
+    cache = ImageCache(str(tmp_path))
+    session = requests.Session()
+    url = f"{server}/red.png"
+
+    data, thumbnail = cache.fetch(url, session)
+    assert data == IMAGES["/red.png"]
+    data_path, meta_path, thumb_path = cache._paths(url)
+    assert os.path.exists(data_path) and os.path.exists(meta_path) and os.path.exists(thumb_path)
+    assert min(Image.open(BytesIO(thumbnail)).size) == THUMBNAIL_SIZE
+
+    data, _ = cache.fetch(url, session)
+    assert data == IMAGES["/red.png"]
+    assert ImageHandler.requests_seen == [("/red.png", None), ("/red.png", '"red.png"')]
+
+    assert cache.get_image(url, session).size == (299, THUMBNAIL_SIZE)
+
+
+def test_eviction_keeps_cache_under_max_bytes(server, tmp_path):
+    cache = ImageCache(str(tmp_path))
+    session = requests.Session()
+    cache.fetch(f"{server}/red.png", session)
+    cache.max_bytes = cache_size(tmp_path) + 100
+
+    # Writing a second entry overflows the bound and evicts the older one
+    image = cache.get_image(f"{server}/blue.png", session)
+    assert image.getpixel((0, 0))[2] > 200
+    assert cache_size(tmp_path) <= cache.max_bytes
+    assert os.path.exists(cache._paths(f"{server}/blue.png")[2])
+    assert not os.path.exists(cache._paths(f"{server}/red.png")[0])
+
+
+def test_entry_larger_than_max_bytes_is_still_returned(server, tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=100)
+    image = cache.get_image(f"{server}/red.png", requests.Session())
+    assert min(image.size) == THUMBNAIL_SIZE
+
+
+def test_not_modified_without_cached_copy_raises(server, tmp_path):
+    cache = ImageCache(str(tmp_path))
+    with pytest.raises(requests.exceptions.HTTPError):
+        cache.fetch(f"{server}/not-modified.png", requests.Session())
+
+
+def test_get_image_on_304_reads_only_the_thumbnail(server, tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path))
+    session = requests.Session()
+    url = f"{server}/red.png"
+    cache.fetch(url, session)
+
+    opened = []
+    real_open = open
+
+    def recording_open(path, *args, **kwargs):
+        opened.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("image_cache.open", recording_open, raising=False)
+    cache.get_image(url, session)
+
+    data_path, _, thumb_path = cache._paths(url)
+    assert thumb_path in opened
+    assert data_path not in opened
+
+
+def test_unreachable_origin_serves_stale_entry(server, tmp_path):
+    cache = ImageCache(str(tmp_path))
+    url = f"{server}/red.png"
+    cache.fetch(url, requests.Session())
+
+    class OfflineSession:
+        def get(self, *args, **kwargs):
+            raise requests.exceptions.ConnectionError("offline")
+
+    data, _ = cache.fetch(url, OfflineSession())
+    assert data == IMAGES["/red.png"]
+    assert min(cache.get_image(url, OfflineSession()).size) == THUMBNAIL_SIZE
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cache.fetch(f"{server}/blue.png", OfflineSession())
+
+
+def test_eviction_drops_to_low_water_without_rescanning(server, tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path))
+    session = requests.Session()
+    cache.fetch(f"{server}/red.png", session)
+    entry_size = cache_size(tmp_path)
+    cache.max_bytes = int(entry_size * 1.5)
+
+    def no_rescan():
+        raise AssertionError("cache directory rescanned after startup")
+
+    monkeypatch.setattr(cache, "_scan", no_rescan)
+    cache.fetch(f"{server}/blue.png", session)
+    assert cache_size(tmp_path) <= cache.max_bytes * cache.low_water
+    assert cache._total_bytes == cache_size(tmp_path)
+
+
+def test_leftover_tmp_files_are_removed_on_startup(tmp_path):
+    leftover = tmp_path / "abc.bin.1234.tmp"
+    leftover.write_bytes(b"partial")
+    cache = ImageCache(str(tmp_path))
+    assert not leftover.exists()
+    assert cache._total_bytes == 0
@@ -0,0 +1,55 @@
+import lexical_index
+import lexical_index_builder
+from lexical_index import LexicalIndex
+from lexical_index_builder import LexicalIndexBuilder
+
+
+def build_index(tmp_path, documents):
+    builder = LexicalIndexBuilder()
+    for document in documents:
+        builder.add(*document)
+    path = str(tmp_path / "lexical_index.json")
+    builder.save(path)
+    return LexicalIndex(path)
+
+
+def test_tokenizers_stay_in_sync():
+    samples = ["BKK19056_SAGE", "Blue Dress, Zara!", "Robe d'été 38", "فستان أزرق", None, float("nan")]
+    for text in samples:
+        assert lexical_index.tokenize(text) == lexical_index_builder.tokenize(text)
+
+
+def test_exact_code_and_brand_matches_win(tmp_path):
+    index = build_index(tmp_path, [
+        (1, "Cutwork Bandeau Dress", "A dress for summer", "Karen Millen", "BKK19056_SAGE"),
+        (2, "Blue Dress", "A blue dress, blue and easy", None, "ZZ100"),
+        (3, "Linen Shirt", "Relaxed dress shirt", "Zara", "ZR200"),
+    ])
+
+    assert index.search("BKK19056_SAGE")[0][0] == 1
+    assert index.search("zara dress")[0][0] == 3
+    assert [point_id for point_id, _ in index.search("blue dress")][:1] == [2]
+    assert index.search("nothing matches") == []
+
+
+def test_limit_and_full_ranking_agree(tmp_path):
+    index = build_index(tmp_path, [
+        (point_id, f"dress {'blue ' * point_id}", None, None, f"C{point_id}")
+        for point_id in range(1, 21)
+    ])
+
+    ranked = index.search("blue dress", limit=None)
+    assert len(ranked) == 20
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+    assert index.search("blue dress", limit=5) == ranked[:5]
+
+
+def test_re_adding_a_point_replaces_its_document(tmp_path):
+    index = build_index(tmp_path, [
+        (1, "Red Dress", None, None, "A1"),
+        (1, "Green Coat", None, None, "A1"),
+    ])
+
+    assert len(index) == 1
+    assert index.search("red") == []
+    assert index.search("coat")[0][0] == 1